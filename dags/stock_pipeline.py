@@ -13,6 +13,19 @@ from airflow.providers.postgres.operators.postgres import PostgresOperator
 from airflow.utils.dates import days_ago
 import os
 
+# Pipeline configuration, resolved once per DAG parse instead of inside
+# every task invocation
+STOCK_SYMBOLS = tuple(s.strip() for s in
+                      os.getenv('STOCK_SYMBOLS', 'AAPL,MSFT,GOOGL,AMZN,TSLA').split(','))
+
+DB_PARAMS = {
+    'host': os.getenv('POSTGRES_HOST', 'postgres'),
+    'port': os.getenv('POSTGRES_PORT', '5432'),
+    'database': os.getenv('POSTGRES_DB', 'stockmarket'),
+    'user': os.getenv('POSTGRES_USER', 'airflow'),
+    'password': os.getenv('POSTGRES_PASSWORD', 'airflow')
+}
+
 # Default arguments for the DAG
 default_args = {
     'owner': 'data-engineering',
@@ -79,34 +92,28 @@ def validate_environment():
     return "Environment validation passed"
 
 def fetch_stock_data(**context):
-    """Execute the stock data fetching script"""
-    import subprocess
+    """Run the stock data fetching pipeline in-process"""
+    import sys
     import logging
-    
+
     logger = logging.getLogger(__name__)
-    
+
+    # Import the pipeline entry point from the mounted scripts directory;
+    # calling it directly avoids a second interpreter start-up and keeps
+    # its logs and return value inside this task
+    scripts_dir = '/opt/airflow/scripts'
+    if scripts_dir not in sys.path:
+        sys.path.insert(0, scripts_dir)
+
+    from fetch_data import main as fetch_main
+
     try:
-        # Execute the fetch_data.py script
-        result = subprocess.run(
-            ['python', '/opt/airflow/scripts/fetch_data.py'],
-            capture_output=True,
-            text=True,
-            cwd='/opt/airflow/scripts',
-            env=os.environ.copy()
-        )
-        
-        if result.returncode != 0:
-            logger.error(f"Script execution failed: {result.stderr}")
-            raise RuntimeError(f"Script execution failed with return code {result.returncode}")
-        
-        logger.info("Stock data fetching completed successfully")
-        logger.info(f"Script output: {result.stdout}")
-        
-        return "Data fetching completed successfully"
-        
-    except subprocess.SubprocessError as e:
-        logger.error(f"Subprocess error: {e}")
-        raise
+        total_records = fetch_main()
+        logger.info(f"Stock data fetching completed successfully: {total_records} records")
+
+        # Returned value lands in XCom for downstream tasks
+        return total_records
+
     except Exception as e:
         logger.error(f"Unexpected error during data fetching: {e}")
         raise
@@ -118,74 +125,59 @@ def verify_data_quality(**context):
     from datetime import datetime, timedelta
     
     logger = logging.getLogger(__name__)
-    
-    # Database connection parameters
-    db_params = {
-        'host': os.getenv('POSTGRES_HOST', 'postgres'),
-        'port': os.getenv('POSTGRES_PORT', '5432'),
-        'database': os.getenv('POSTGRES_DB', 'stockmarket'),
-        'user': os.getenv('POSTGRES_USER', 'airflow'),
-        'password': os.getenv('POSTGRES_PASSWORD', 'airflow')
-    }
-    
+
     try:
-        conn = psycopg2.connect(**db_params)
+        conn = psycopg2.connect(**DB_PARAMS)
         cursor = conn.cursor()
         
         # Get today's date (market close)
         today = datetime.now().date()
-        
-        # Check if we have data for today
+        tomorrow = today + timedelta(days=1)
+
+        # One pass over today's rows: per-symbol counts and NULL counts come
+        # from a single aggregated scan. The half-open timestamp range is
+        # sargable, so the timestamp indexes stay usable (DATE(timestamp)
+        # would force a full scan).
         cursor.execute("""
-            SELECT symbol, COUNT(*) as data_points
-            FROM stock_prices 
-            WHERE DATE(timestamp) = %s
+            SELECT symbol,
+                   COUNT(*) AS data_points,
+                   COUNT(*) FILTER (
+                       WHERE open IS NULL OR high IS NULL
+                          OR low IS NULL OR close IS NULL
+                   ) AS null_records
+            FROM stock_prices
+            WHERE timestamp >= %s AND timestamp < %s
             GROUP BY symbol
-        """, (today,))
-        
-        today_data = cursor.fetchall()
-        
-        # Get configured symbols
-        symbols_str = os.getenv('STOCK_SYMBOLS', 'AAPL,MSFT,GOOGL,AMZN,TSLA')
-        expected_symbols = [s.strip() for s in symbols_str.split(',')]
-        
-        # Verify data completeness
+        """, (today, tomorrow))
+
+        today_stats = {symbol: (data_points, null_records)
+                       for symbol, data_points, null_records in cursor.fetchall()}
+
+        # Verify data completeness against the configured symbols
+        expected_symbols = STOCK_SYMBOLS
         missing_symbols = []
         for symbol in expected_symbols:
-            symbol_data = [row for row in today_data if row[0] == symbol]
-            if not symbol_data:
+            if symbol not in today_stats:
                 missing_symbols.append(symbol)
             else:
-                data_points = symbol_data[0][1]
+                data_points = today_stats[symbol][0]
                 logger.info(f"Symbol {symbol}: {data_points} data points for today")
-        
+
         if missing_symbols:
             logger.warning(f"Missing data for symbols: {missing_symbols}")
         else:
             logger.info("All expected symbols have data for today")
-        
+
         # Check for any NULL values in critical fields
-        cursor.execute("""
-            SELECT symbol, COUNT(*) as null_records
-            FROM stock_prices 
-            WHERE DATE(timestamp) = %s 
-            AND (open IS NULL OR high IS NULL OR low IS NULL OR close IS NULL)
-            GROUP BY symbol
-        """, (today,))
-        
-        null_data = cursor.fetchall()
-        if null_data:
-            for symbol, null_count in null_data:
+        null_found = False
+        for symbol, (_, null_count) in today_stats.items():
+            if null_count:
+                null_found = True
                 logger.warning(f"Symbol {symbol}: {null_count} records with NULL values")
-        else:
+        if not null_found:
             logger.info("No NULL values found in critical fields")
-        
-        # Get total record count for today
-        cursor.execute("""
-            SELECT COUNT(*) FROM stock_prices WHERE DATE(timestamp) = %s
-        """, (today,))
-        
-        total_records = cursor.fetchone()[0]
+
+        total_records = sum(data_points for data_points, _ in today_stats.values())
         logger.info(f"Total records for today: {total_records}")
         
         conn.close()
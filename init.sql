@@ -9,11 +9,11 @@ CREATE TABLE IF NOT EXISTS stock_prices (
     id SERIAL PRIMARY KEY,
     symbol VARCHAR(10) NOT NULL,
     timestamp TIMESTAMP NOT NULL,
-    open NUMERIC(10,4),
-    high NUMERIC(10,4),
-    low NUMERIC(10,4),
-    close NUMERIC(10,4),
-    volume BIGINT,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     CONSTRAINT uq_symbol_time UNIQUE (symbol, timestamp)
@@ -24,6 +24,23 @@ CREATE INDEX IF NOT EXISTS idx_stock_prices_symbol ON stock_prices(symbol);
 CREATE INDEX IF NOT EXISTS idx_stock_prices_timestamp ON stock_prices(timestamp);
 CREATE INDEX IF NOT EXISTS idx_stock_prices_symbol_timestamp ON stock_prices(symbol, timestamp);
 
+-- BRIN suits the append-only, monotonically increasing timestamps: a tiny
+-- fraction of a btree's size for the daily range scans in the quality checks
+CREATE INDEX IF NOT EXISTS idx_stock_prices_timestamp_brin ON stock_prices
+    USING BRIN (timestamp) WITH (pages_per_range = 32);
+
+-- UNLOGGED staging table for bulk loads: COPY into it skips WAL entirely,
+-- then one INSERT ... SELECT merges the batch into stock_prices
+CREATE UNLOGGED TABLE IF NOT EXISTS stock_prices_stage (
+    symbol VARCHAR(10),
+    timestamp TIMESTAMP,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume INTEGER
+);
+
 -- Create function to update updated_at timestamp
 CREATE OR REPLACE FUNCTION update_updated_at_column()
 RETURNS TRIGGER AS $$